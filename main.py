@@ -1,13 +1,19 @@
 # Import necessary libraries
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from iso3166 import countries
-import json
+from itertools import chain
+from pathlib import Path
+import re
 import argparse
-import pandas as pd
-import requests
+import orjson
+import requests_cache
+import sys
 
 # Define a data class for hotel location
-@dataclass
+@dataclass(slots=True)
 class Location:
     lat: float
     lng: float
@@ -16,26 +22,26 @@ class Location:
     country: str
 
 # Define a data class for hotel amenities
-@dataclass
+@dataclass(slots=True)
 class Amenities:
     general: list[str]
     room: list[str]
 
 # Define a data class for hotel image
-@dataclass
+@dataclass(slots=True)
 class Image:
     link: str
     description: str
 
 # Define a data class for hotel images
-@dataclass
+@dataclass(slots=True)
 class Images:
     rooms: list[Image] = field(default_factory=list)
     site: list[Image] = field(default_factory=list)
     amenities: list[Image] = field(default_factory=list)
 
 # Define a data class for hotels
-@dataclass
+@dataclass(slots=True)
 class Hotel:
     id: str
     destination_id: str
@@ -46,6 +52,19 @@ class Hotel:
     images: Images
     booking_conditions: list[str]
 
+# Resolve dataclass fields once instead of on every merge
+HOTEL_FIELDS = fields(Hotel)
+LOCATION_FIELDS = fields(Location)
+AMENITIES_FIELDS = fields(Amenities)
+IMAGES_FIELDS = fields(Images)
+
+# Shared HTTP session so supplier requests reuse pooled connections,
+# with responses cached on disk next to this script for repeated runs
+CACHE_PATH = Path(__file__).with_name('supplier_cache')
+CACHE_EXPIRE_SECONDS = 300
+_SESSION = requests_cache.CachedSession(str(CACHE_PATH), backend='sqlite', expire_after=CACHE_EXPIRE_SECONDS)
+REQUEST_TIMEOUT = 10
+
 # Define a base class for suppliers
 class BaseSupplier:
     def endpoint():
@@ -57,20 +76,25 @@ class BaseSupplier:
     def fetch(self):
         """Fetch data from the supplier's endpoint and parse it into Hotel objects"""
         url = self.endpoint()
-        resp = requests.get(url)
-        return [self.parse(dto) for dto in resp.json()]
+        resp = _SESSION.get(url, timeout=REQUEST_TIMEOUT)
+        return [self.parse(dto) for dto in orjson.loads(resp.content)]
+
+# Match a lowercase letter followed by an uppercase one, e.g. "BusinessCenter"
+_CAMEL_PATTERN = re.compile(r'([a-z])([A-Z])')
 
 # Modify amenities format for Acme supplier
 def acme_amenities_modify(r):
     """Format and clean the amenities data from Acme supplier"""
+    # Short names such as "WiFi" are kept as a single word
     if len(r) <= 5:
         return r.strip().lower()
-    ret = ''
-    for i in range(len(r)):
-        ret += r[i]
-        if i + 1 < len(r) and r[i].islower() and r[i + 1].isupper():
-            ret += ' '
-    return ret.strip().lower()
+    return _CAMEL_PATTERN.sub(r'\1 \2', r).strip().lower()
+
+# Resolve a country code to its name, caching repeated lookups
+@lru_cache(maxsize=512)
+def _country_name(code):
+    """Return the country name for an ISO 3166 country code"""
+    return countries.get(code).name
 
 # Define the Acme supplier class
 class Acme(BaseSupplier):
@@ -91,7 +115,7 @@ class Acme(BaseSupplier):
                 lng=dto['Longitude'],
                 address=dto['Address'],
                 city=dto['City'],
-                country=countries.get(dto['Country']).name
+                country=_country_name(dto['Country'])
             ),
             description=dto['Description'],
             amenities=Amenities(
@@ -187,93 +211,101 @@ class Patagonia(BaseSupplier):
 # Find the longest content among a list of contents
 def longest_content(content_list, default_value):
     """Return the longest content from a list, or a default value if empty"""
-    if len(content_list) == 0:
-        return default_value
-    ret = None
+    # Measure each content once, treating empty values as zero length
+    cleaned = []
     for i in content_list:
-        if ret is None:
-            ret = i
         content = str(i)
-        if content == 'None' or content == '[]':
-            content = ''
-        if len(str(ret)) < len(content):
-            ret = i
-    return ret
+        cleaned.append((0 if content in ('None', '[]') else len(content), i))
+    if not cleaned:
+        return default_value
+    return max(cleaned, key=lambda pair: pair[0])[1]
 
 # Service to manage and merge hotel data from multiple suppliers
 class HotelsService:
     def __init__(self):
         """Initialize the HotelsService"""
         self.hotels = []
+        self._find_cache = dict()
 
-    def merge_amenities(self, df):
+    def merge_amenities(self, hotels):
         """Merge amenities from multiple data sources"""
         ret = dict()
-        for amenities_field in fields(Amenities):
-            ret[amenities_field.name] = list(set(sum([i[amenities_field.name] if amenities_field.name in i.keys() else [] for i in df], [])))
+        for amenities_field in AMENITIES_FIELDS:
+            ret[amenities_field.name] = list({*chain.from_iterable(getattr(h.amenities, amenities_field.name) or [] for h in hotels)})
         return ret
 
-    def merge_images(self, df):
+    def merge_images(self, hotels):
         """Merge images from multiple data sources"""
         ret = dict()
-        for images_field in fields(Images):
-            filtered = sum([i[images_field.name] if i is not None and images_field.name in i.keys() else [] for i in df], [])
-            seen = set()
-            ret[images_field.name] = []
+        for images_field in IMAGES_FIELDS:
+            filtered = chain.from_iterable(getattr(h.images, images_field.name) or [] for h in hotels)
+            # Keep the first image seen for each link, in insertion order
+            unique = dict()
             for element in filtered:
-                if element['link'] not in seen:
-                    seen.add(element['link'])
-                    ret[images_field.name].append(element)
+                unique.setdefault(element.link, element)
+            ret[images_field.name] = [{'link': element.link, 'description': element.description} for element in unique.values()]
         return ret
 
-    def merge_location(self, df, default_value):
+    def merge_location(self, hotels, default_value):
         """Merge location data from multiple data sources"""
         ret = dict()
-        for location_field in fields(Location):
-            ret[location_field.name] = longest_content([i[location_field.name] if location_field.name in i.keys() else [] for i in df], default_value)
+        for location_field in LOCATION_FIELDS:
+            ret[location_field.name] = longest_content([getattr(h.location, location_field.name) for h in hotels], default_value)
         return ret
 
     def merge_and_save(self, all_supplier_data):
         """Merge data from all suppliers and save the final dataset"""
-        df = pd.DataFrame(all_supplier_data)
-        hotel_ids = list(set([data.id for data in all_supplier_data]))
+        # Group hotels by id in a single pass, keeping first-seen order
+        groups = defaultdict(list)
+        for data in all_supplier_data:
+            groups[data.id].append(data)
 
-        for hotel_id in hotel_ids:
-            cur_df = df.loc[df['id'] == hotel_id]
+        for hotel_id, cur_hotels in groups.items():
             hotel = dict()
 
-            for hotel_field in fields(Hotel):
+            for hotel_field in HOTEL_FIELDS:
                 if hotel_field.name == 'amenities':
-                    hotel['amenities'] = self.merge_amenities(cur_df['amenities'])
+                    hotel['amenities'] = self.merge_amenities(cur_hotels)
                 elif hotel_field.name == 'images':
-                    hotel['images'] = self.merge_images(cur_df['images'])
+                    hotel['images'] = self.merge_images(cur_hotels)
                 elif hotel_field.name == 'location':
-                    hotel['location'] = self.merge_location(cur_df['location'], hotel_field.default)
+                    hotel['location'] = self.merge_location(cur_hotels, hotel_field.default)
                 else:
-                    hotel[hotel_field.name] = longest_content(cur_df[hotel_field.name], hotel_field.default)
+                    hotel[hotel_field.name] = longest_content([getattr(h, hotel_field.name) for h in cur_hotels], hotel_field.default)
 
             self.hotels.append(hotel)
 
-        self.hotels = pd.DataFrame(self.hotels)
-    
+        # Saved hotels changed, so earlier query results are stale
+        self._find_cache.clear()
+
     def find(self, hotel_ids, destination_ids):
         """Find hotels based on hotel IDs and/or destination IDs"""
-        hotel_list = hotel_ids.split(',') if hotel_ids != 'none' else []
+        key = (hotel_ids, destination_ids)
+        if key not in self._find_cache:
+            self._find_cache[key] = self._find(hotel_ids, destination_ids)
+        # Hand out copies so callers can't modify the saved or cached hotels;
+        # nested amenities, images and location values are shared and read-only
+        return [dict(hotel) for hotel in self._find_cache[key]]
+
+    def _find(self, hotel_ids, destination_ids):
+        """Filter and order the saved hotels for a query"""
+        hotel_list = hotel_ids.split(',') if hotel_ids and hotel_ids != 'none' else []
         hotel_ids_rev = {value: pos for pos, value in enumerate(hotel_list)}
         
-        destination_list = destination_ids.split(',') if destination_ids != 'none' else []
+        destination_list = destination_ids.split(',') if destination_ids and destination_ids != 'none' else []
         destination_ids_rev = {value: pos for pos, value in enumerate(destination_list)}
 
-        ret = self.hotels[
-            ((len(hotel_list) == 0) | self.hotels['id'].isin(hotel_list)) &
-            ((len(destination_list) == 0) | self.hotels['destination_id'].isin(destination_list))
-        ]
-        ret = json.loads(ret.to_json(orient='records'))
+        # Only scan the hotels for the filters that were actually given
+        ret = self.hotels
+        if hotel_ids_rev:
+            ret = [hotel for hotel in ret if hotel['id'] in hotel_ids_rev]
+        if destination_ids_rev:
+            ret = [hotel for hotel in ret if hotel['destination_id'] in destination_ids_rev]
 
         if hotel_list != [] or destination_list != []:
             ret = sorted(ret, key=lambda x: (hotel_ids_rev.get(x['id'], 0), destination_ids_rev.get(x['destination_id'], 0)))
 
-        return ret
+        return tuple(ret)
 
 # Fetch and filter hotels
 def fetch_hotels(hotel_ids=None, destination_ids=None):
@@ -284,10 +316,11 @@ def fetch_hotels(hotel_ids=None, destination_ids=None):
         Patagonia(),
     ]
 
-    # Fetch data from all suppliers
+    # Fetch data from all suppliers concurrently
     all_supplier_data = []
-    for supp in suppliers:
-        all_supplier_data.extend(supp.fetch())
+    with ThreadPoolExecutor(max_workers=len(suppliers)) as executor:
+        for result in executor.map(lambda supp: supp.fetch(), suppliers):
+            all_supplier_data.extend(result)
 
     # Merge all the data and save it in-memory somewhere
     svc = HotelsService()
@@ -314,7 +347,7 @@ def main():
     destination_ids = args.destination_ids
     
     result = fetch_hotels(hotel_ids, destination_ids)
-    print(json.dumps(result, indent=2))
+    sys.stdout.buffer.write(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
 
 # Entry point of the script
 if __name__ == "__main__":